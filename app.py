@@ -5,22 +5,193 @@ Python 3.10+ | Flask 3.0.0 | yt-dlp 2024.12.13
 """
 
 import os
+import atexit
 import re
-import json
+import copy
+import time
+import uuid
+import queue
+import functools
 import threading
-from flask import Flask, request, jsonify, send_file, render_template
+from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, request, jsonify, send_file, render_template
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from flask_compress import Compress
+import orjson
 import yt_dlp
 
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Provider JSON do Flask usando orjson (extensão em C) no lugar do json da stdlib."""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
+# Compressão (gzip/br) apenas das respostas JSON da API;
+# arquivos de mídia (MP4/M4A) já são comprimidos e são servidos sem recodificação
+app.config['COMPRESS_MIMETYPES'] = ['application/json']
+app.config['COMPRESS_MIN_SIZE'] = 500
+Compress(app)
+
 # Diretório para downloads temporários
-DOWNLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'downloads')
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+DOWNLOAD_DIR = Path(__file__).resolve().parent / 'downloads'
+DOWNLOAD_DIR.mkdir(exist_ok=True)
+DOWNLOAD_DIR_LEN = len(str(DOWNLOAD_DIR))
+
+# Tamanho máximo do título no nome do arquivo
+# Windows tem limite de ~260 caracteres para caminhos: reservar o diretório,
+# o separador e o maior sufixo possível ("_2160p.mp4"), limitado a 150 caracteres
+MAX_PATH_LENGTH = 250
+MAX_TITLE_LENGTH = max(min(150, MAX_PATH_LENGTH - (DOWNLOAD_DIR_LEN + len('_2160p.mp4') + 2)), 0)
+
+# Sufixos fixos dos templates de saída (anexados ao título sanitizado)
+_AUDIO_SUFFIX = '.%(ext)s'
+_VIDEO_SUFFIX = '_%(height)sp.%(ext)s'
+
+# Regexes de sanitização pré-compiladas (usadas a cada download)
+# Windows não permite: < > : " / \ | ? * e caracteres de controle (0-31)
+_INVALID_CHARS_RE = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+_MULTISPACE_RE = re.compile(r'\s+')
+
+# Pool de workers para downloads em segundo plano (não bloqueia as requisições HTTP)
+DOWNLOAD_WORKERS = 4
+executor = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS, thread_name_prefix='download')
+
+# Threads do servidor HTTP (Waitress) para atender as requisições
+SERVER_THREADS = 8
+
+# Status finais de um job (o 'finished' do yt-dlp marca só o fim de cada stream baixado)
+FINAL_STATUSES = ('completed', 'error')
+SSE_HEARTBEAT = 30  # segundos
+
+# Limites do registro de progresso
+PROGRESS_MAX_ENTRIES = 1000
+PROGRESS_TTL = 600  # segundos após o job terminar
+PROGRESS_CLEANUP_INTERVAL = 60  # segundos
+
+
+class LRUProgress:
+    """
+    Registro de progresso limitado: mantém no máximo max_entries jobs (LRU por
+    escrita) e expira jobs encerrados há mais de ttl segundos.
+    
+    Cada snapshot é um dict imutável substituído por inteiro (nunca alterado
+    campo a campo), então os leitores em /api/progress sempre veem um estado
+    consistente sem precisar de lock; só as escritas são serializadas.
+    """
+    
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # job_id -> (snapshot, finished_at)
+        self._lock = threading.Lock()
+    
+    def get(self, job_id: str, default=None):
+        """Retorna o snapshot atual do job."""
+        entry = self._entries.get(job_id)
+        return entry[0] if entry is not None else default
+    
+    def put(self, job_id: str, snapshot: dict) -> None:
+        """Publica um snapshot, descartando o job mais antigo se passar do limite."""
+        finished_at = time.monotonic() if snapshot.get('status') in FINAL_STATUSES else None
+        with self._lock:
+            self._entries[job_id] = (snapshot, finished_at)
+            self._entries.move_to_end(job_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def evict_expired(self) -> list:
+        """Remove os jobs encerrados há mais de ttl segundos e retorna seus ids."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                job_id for job_id, (_, finished_at) in self._entries.items()
+                if finished_at is not None and now - finished_at > self.ttl
+            ]
+            for job_id in expired:
+                del self._entries[job_id]
+        return expired
+
+
+# Progresso dos downloads (chave: job_id)
+download_progress = LRUProgress(PROGRESS_MAX_ENTRIES, PROGRESS_TTL)
+
+# Sinaliza os streams SSE em /api/progress-stream quando algum snapshot muda;
+# cada stream relê o snapshot mais recente do seu job (sem filas por job)
+progress_changed = threading.Condition()
+
+
+def set_progress(job_id: str, **fields) -> None:
+    """Publica um novo snapshot de progresso para o job (troca atômica)."""
+    with progress_changed:
+        download_progress.put(job_id, fields)
+        progress_changed.notify_all()
 
-# Cache de progresso de downloads
-download_progress = {}
+
+def _progress_cleanup_loop() -> None:
+    """Remove periodicamente o progresso de jobs expirados."""
+    while True:
+        time.sleep(PROGRESS_CLEANUP_INTERVAL)
+        download_progress.evict_expired()
+
+
+threading.Thread(target=_progress_cleanup_loop, name='progress-cleanup', daemon=True).start()
+
+
+# Cache das informações extraídas em /api/info, reaproveitado em /api/download
+# para evitar uma segunda consulta ao YouTube logo em seguida
+INFO_CACHE_TTL = 300  # segundos
+INFO_CACHE_MAX_ENTRIES = 100
+_info_cache = OrderedDict()  # url -> (timestamp, info), da mais antiga para a mais recente
+_info_cache_lock = threading.Lock()
+
+
+def _evict_expired_info(now: float) -> None:
+    """Remove as entradas expiradas do cache (chamar com _info_cache_lock adquirido)."""
+    while _info_cache:
+        ts, _ = next(iter(_info_cache.values()))
+        if now - ts <= INFO_CACHE_TTL:
+            break
+        _info_cache.popitem(last=False)
+
+
+def cache_info(url: str, info: dict) -> None:
+    """
+    Armazena as informações do vídeo no cache, respeitando TTL e tamanho máximo.
+    
+    Guarda a forma sanitizada (como no --write-info-json): sem o resultado da
+    seleção de formatos (requested_formats etc.), pronta para ser reprocessada.
+    """
+    info = yt_dlp.YoutubeDL.sanitize_info(info, remove_private_keys=True)
+    now = time.monotonic()
+    with _info_cache_lock:
+        _info_cache[url] = (now, info)
+        _info_cache.move_to_end(url)
+        _evict_expired_info(now)
+        while len(_info_cache) > INFO_CACHE_MAX_ENTRIES:
+            _info_cache.popitem(last=False)
+
+
+def get_cached_info(url: str):
+    """Retorna as informações em cache ainda válidas ou None, removendo entradas expiradas."""
+    with _info_cache_lock:
+        _evict_expired_info(time.monotonic())
+        entry = _info_cache.get(url)
+    return entry[1] if entry else None
 
 
 def get_ydl_opts_base():
@@ -38,6 +209,25 @@ def get_ydl_opts_base():
     }
 
 
+def _create_info_ydl():
+    """Cria a instância do yt-dlp usada para extrair informações em /api/info."""
+    ydl_opts = get_ydl_opts_base()
+    ydl_opts['extract_flat'] = False
+    return yt_dlp.YoutubeDL(ydl_opts)
+
+
+# Pool de instâncias persistentes do yt-dlp para /api/info: cada uma mantém suas
+# conexões (keep-alive) com youtube.com/googlevideo.com em vez de refazer o
+# handshake TLS a cada requisição. O yt-dlp não é thread-safe, então cada
+# instância atende uma extração por vez, mas várias extrações rodam em paralelo.
+INFO_YDL_POOL_SIZE = DOWNLOAD_WORKERS
+_info_ydl_pool = queue.Queue()
+for _ in range(INFO_YDL_POOL_SIZE):
+    _ydl = _create_info_ydl()
+    _info_ydl_pool.put(_ydl)
+    atexit.register(_ydl.close)
+
+
 def sanitize_filename(filename: str) -> str:
     """
     Remove caracteres inválidos do nome do arquivo para Windows.
@@ -47,12 +237,10 @@ def sanitize_filename(filename: str) -> str:
         return 'video'
     
     # Remover caracteres inválidos do Windows
-    # Windows não permite: < > : " / \ | ? * e caracteres de controle (0-31)
-    invalid_chars = r'[<>:"/\\|?*\x00-\x1f]'
-    filename = re.sub(invalid_chars, '_', filename)
+    filename = _INVALID_CHARS_RE.sub('_', filename)
     
     # Remover espaços múltiplos e espaços no início/fim
-    filename = re.sub(r'\s+', ' ', filename).strip()
+    filename = _MULTISPACE_RE.sub(' ', filename).strip()
     
     # Remover pontos no final (Windows não permite)
     filename = filename.rstrip('. ')
@@ -70,27 +258,23 @@ def sanitize_filename(filename: str) -> str:
     return filename
 
 
-def progress_hook(d):
-    """Hook para capturar progresso do download."""
+def progress_hook(job_id, d):
+    """Hook para capturar progresso do download do job."""
     if d['status'] == 'downloading':
-        video_id = d.get('info_dict', {}).get('id', 'unknown')
         total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
         downloaded = d.get('downloaded_bytes', 0)
         
         if total > 0:
             percent = (downloaded / total) * 100
-            download_progress[video_id] = {
-                'status': 'downloading',
-                'percent': round(percent, 1),
-                'speed': d.get('speed', 0),
-                'eta': d.get('eta', 0)
-            }
+            set_progress(
+                job_id,
+                status='downloading',
+                percent=round(percent, 1),
+                speed=d.get('speed', 0),
+                eta=d.get('eta', 0)
+            )
     elif d['status'] == 'finished':
-        video_id = d.get('info_dict', {}).get('id', 'unknown')
-        download_progress[video_id] = {
-            'status': 'finished',
-            'percent': 100
-        }
+        set_progress(job_id, status='finished', percent=100)
 
 
 @app.route('/')
@@ -117,16 +301,18 @@ def get_video_info():
         if not url:
             return jsonify({'error': 'URL não fornecida'}), 400
         
-        # Configuração do yt-dlp para extrair informações
-        ydl_opts = get_ydl_opts_base()
-        ydl_opts['extract_flat'] = False
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        # Instância do pool: reaproveita as conexões HTTP/TLS entre requisições
+        ydl = _info_ydl_pool.get()
+        try:
             info = ydl.extract_info(url, download=False)
+        finally:
+            _info_ydl_pool.put(ydl)
+        cache_info(url, info)
         
         # Processar formatos disponíveis
-        # Agrupar por altura e pegar o melhor de cada qualidade
-        formats_by_height = {}
+        # Passo 1: agrupar por altura guardando apenas uma tupla leve com o
+        # melhor candidato de cada qualidade (sem montar dicts a cada troca)
+        formats_by_height = {}  # altura -> (vbr, filesize, format_id, ext, has_audio)
         
         for f in info.get('formats', []):
             # Filtrar apenas formatos com vídeo
@@ -137,62 +323,48 @@ def get_video_info():
             if not height:
                 continue
             
-            format_id = f.get('format_id')
-            ext = f.get('ext', 'mp4')
-            filesize = f.get('filesize') or f.get('filesize_approx', 0)
+            filesize = f.get('filesize') or f.get('filesize_approx') or 0
             vbr = f.get('vbr') or f.get('tbr') or 0  # Video bitrate
             
             # Guardar o formato com maior bitrate/tamanho para cada altura
-            if height not in formats_by_height:
-                formats_by_height[height] = {
-                    'format_id': format_id,
-                    'quality': f"{height}p",
-                    'height': height,
-                    'ext': ext,
-                    'filesize': filesize,
-                    'filesize_str': format_size(filesize) if filesize else 'Tamanho desconhecido',
-                    'has_audio': f.get('acodec') != 'none',
-                    'vbr': vbr
-                }
-            else:
-                # Substituir se tiver maior bitrate ou tamanho
-                existing = formats_by_height[height]
-                if vbr > existing.get('vbr', 0) or (filesize > existing.get('filesize', 0) and vbr >= existing.get('vbr', 0)):
-                    formats_by_height[height] = {
-                        'format_id': format_id,
-                        'quality': f"{height}p",
-                        'height': height,
-                        'ext': ext,
-                        'filesize': filesize,
-                        'filesize_str': format_size(filesize) if filesize else 'Tamanho desconhecido',
-                        'has_audio': f.get('acodec') != 'none',
-                        'vbr': vbr
-                    }
-        
-        # Converter para lista e ordenar por qualidade (maior primeiro)
-        formats = list(formats_by_height.values())
-        formats.sort(key=lambda x: x['height'], reverse=True)
+            existing = formats_by_height.get(height)
+            if existing is None or vbr > existing[0] or (filesize > existing[1] and vbr >= existing[0]):
+                formats_by_height[height] = (
+                    vbr,
+                    filesize,
+                    f.get('format_id'),
+                    f.get('ext', 'mp4'),
+                    f.get('acodec') != 'none'
+                )
         
-        # Selecionar qualidades comuns disponíveis
+        # Passo 2: montar os dicts de resposta só para as qualidades comuns disponíveis
+        # (a ordem de target_heights já é do maior para o menor)
         final_formats = []
         target_heights = [2160, 1440, 1080, 720, 480, 360, 240]
         
         for target in target_heights:
-            for f in formats:
-                if f['height'] == target:
-                    # Remover campo vbr interno antes de retornar
-                    fmt = {k: v for k, v in f.items() if k != 'vbr'}
-                    final_formats.append(fmt)
-                    break
+            best = formats_by_height.get(target)
+            if best is None:
+                continue
+            _, filesize, format_id, ext, has_audio = best
+            final_formats.append({
+                'format_id': format_id,
+                'quality': f"{target}p",
+                'height': target,
+                'ext': ext,
+                'filesize': filesize,
+                'filesize_str': format_size(filesize) if filesize else 'Tamanho desconhecido',
+                'has_audio': has_audio
+            })
         
         # Adicionar opção de apenas áudio
         final_formats.append({
             'format_id': 'bestaudio',
             'quality': 'Apenas Áudio',
             'height': 0,
-            'ext': 'mp3',
+            'ext': 'm4a',
             'filesize': 0,
-            'filesize_str': 'MP3',
+            'filesize_str': 'M4A',
             'has_audio': True,
             'audio_only': True
         })
@@ -219,7 +391,10 @@ def get_video_info():
 @app.route('/api/download', methods=['POST'])
 def download_video():
     """
-    Inicia o download do vídeo com a qualidade selecionada.
+    Enfileira o download do vídeo com a qualidade selecionada.
+    
+    O download roda em segundo plano no pool de workers; o cliente acompanha
+    o andamento por /api/progress/<job_id> até o status 'completed' ou 'error'.
     
     Request Body:
         url (str): URL do vídeo
@@ -227,7 +402,7 @@ def download_video():
         quality (str): Label da qualidade (ex: 1080p)
     
     Returns:
-        JSON com status do download
+        JSON com o job_id do download (HTTP 202)
     """
     try:
         data = request.get_json()
@@ -241,19 +416,22 @@ def download_video():
         # Determinar formato de saída
         is_audio_only = data.get('audio_only', False)
         
-        # Configuração base
+        job_id = uuid.uuid4().hex
+        
+        # Configuração base (o template de saída é definido no worker, após sanitizar o título)
         ydl_opts = get_ydl_opts_base()
-        ydl_opts['progress_hooks'] = [progress_hook]
+        ydl_opts['progress_hooks'] = [functools.partial(progress_hook, job_id)]
         
         if is_audio_only:
-            # Configuração para apenas áudio (MP3)
+            # Configuração para apenas áudio (M4A)
+            # O YouTube já entrega áudio AAC (m4a): priorizar esse formato faz o
+            # FFmpeg apenas copiar o stream, sem recodificar
             ydl_opts.update({
-                'format': 'bestaudio/best',
-                'outtmpl': os.path.join(DOWNLOAD_DIR, '%(title)s.%(ext)s'),
+                'format': 'bestaudio[ext=m4a]/bestaudio/best',
                 'postprocessors': [{
                     'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '320',
+                    'preferredcodec': 'm4a',
+                    'preferredquality': '192',
                 }],
             })
         else:
@@ -263,105 +441,162 @@ def download_video():
             
             ydl_opts.update({
                 'format': format_str,
-                'outtmpl': os.path.join(DOWNLOAD_DIR, '%(title)s_%(height)sp.%(ext)s'),
                 'merge_output_format': 'mp4',
             })
         
-        # Extrair informações primeiro para obter o nome do arquivo
-        info_opts = get_ydl_opts_base()
-        with yt_dlp.YoutubeDL(info_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            video_id = info.get('id')
-            title = sanitize_filename(info.get('title', 'video'))
-        
-        download_progress[video_id] = {'status': 'starting', 'percent': 0}
-        
-        # Garantir que o título não seja muito longo para o caminho completo
-        # Windows tem limite de ~260 caracteres para caminhos
-        max_title_length = 150  # Deixar espaço para caminho, extensão e sufixos
-        if len(title) > max_title_length:
-            title = title[:max_title_length].rstrip()
-        
-        # Atualizar template de saída com título sanitizado
-        if is_audio_only:
-            ydl_opts['outtmpl'] = os.path.join(DOWNLOAD_DIR, f'{title}.%(ext)s')
-        else:
-            ydl_opts['outtmpl'] = os.path.join(DOWNLOAD_DIR, f'{title}_%(height)sp.%(ext)s')
-        
-        # Verificar se o caminho completo não é muito longo
-        test_path = ydl_opts['outtmpl'].replace('%(ext)s', 'mp4').replace('%(height)s', '1080')
-        if len(test_path) > 250:
-            # Se ainda for muito longo, encurtar mais o título
-            remaining = 250 - len(DOWNLOAD_DIR) - 20  # 20 para extensão e sufixos
-            title = title[:remaining].rstrip() if remaining > 0 else 'video'
-            if is_audio_only:
-                ydl_opts['outtmpl'] = os.path.join(DOWNLOAD_DIR, f'{title}.%(ext)s')
-            else:
-                ydl_opts['outtmpl'] = os.path.join(DOWNLOAD_DIR, f'{title}_%(height)sp.%(ext)s')
+        set_progress(job_id, status='starting', percent=0)
+        executor.submit(_run_download, url, ydl_opts, job_id, is_audio_only)
         
-        # Realizar download
+        return jsonify({'success': True, 'job_id': job_id}), 202
+    
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+
+def _run_download(url: str, ydl_opts: dict, job_id: str, is_audio_only: bool) -> None:
+    """
+    Executa o download em um worker do pool e publica o resultado final
+    no registro de progresso (download_progress).
+    """
+    try:
+        # Uma única instância do yt-dlp para extrair as informações e baixar,
+        # sem uma segunda extração dentro de ydl.download()
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
-        
-        # Encontrar arquivo baixado
-        downloaded_file = None
-        for f in os.listdir(DOWNLOAD_DIR):
-            if title[:30] in f:  # Comparar início do título
-                downloaded_file = os.path.join(DOWNLOAD_DIR, f)
-                break
+            # Obter informações para o nome do arquivo (do cache de /api/info, se possível)
+            cached = get_cached_info(url)
+            if cached is not None:
+                # Cópia: o processamento abaixo altera o dict e o cache é compartilhado
+                # (o cache já guarda a forma sanitizada, pronta para reprocessar)
+                info = copy.deepcopy(cached)
+            else:
+                info = ydl.extract_info(url, download=False)
+            video_id = info.get('id')
+            title = sanitize_filename(info.get('title', 'video'))
+            
+            # Garantir que o título não seja muito longo para o caminho completo
+            title = title[:MAX_TITLE_LENGTH].rstrip() or 'video'
+            
+            # Template de saída com título sanitizado
+            suffix = _AUDIO_SUFFIX if is_audio_only else _VIDEO_SUFFIX
+            outtmpl = str(DOWNLOAD_DIR / f'{title}{suffix}')
+            
+            # Atualizar o template na instância já criada
+            ydl.params['outtmpl']['default'] = outtmpl
+            
+            # Realizar download a partir das informações já extraídas
+            downloaded_info = ydl.process_ie_result(info, download=True)
+        # Caminho exato do arquivo gravado pelo yt-dlp, já atualizado pelo
+        # pós-processamento (mesclagem MP4 ou extração de áudio M4A)
+        downloaded_file = Path(downloaded_info['requested_downloads'][-1]['filepath'])
         
-        if downloaded_file and os.path.exists(downloaded_file):
-            return jsonify({
-                'success': True,
-                'video_id': video_id,
-                'filename': os.path.basename(downloaded_file),
-                'message': 'Download concluído!'
-            })
+        if downloaded_file.is_file():
+            set_progress(
+                job_id,
+                status='completed',
+                percent=100,
+                video_id=video_id,
+                filename=downloaded_file.name,
+                message='Download concluído!'
+            )
         else:
-            return jsonify({'error': 'Arquivo não encontrado após download'}), 500
+            set_progress(job_id, status='error', error='Arquivo não encontrado após download')
     
-    except yt_dlp.DownloadError as e:
-        error_msg = str(e)
+    except Exception as e:
+        set_progress(job_id, status='error', error=download_error_message(e))
+
+
+def download_error_message(e: Exception) -> str:
+    """Traduz uma exceção do download em mensagem de erro para o usuário."""
+    error_msg = str(e)
+    if isinstance(e, yt_dlp.DownloadError):
         # Tratar erros específicos de arquivo inválido
         if 'Invalid argument' in error_msg or 'Errno 22' in error_msg:
-            return jsonify({
-                'error': 'Erro ao salvar arquivo: nome do arquivo inválido. Tente novamente ou escolha outro vídeo.'
-            }), 400
-        return jsonify({'error': f'Erro no download: {error_msg}'}), 400
-    except OSError as e:
+            return 'Erro ao salvar arquivo: nome do arquivo inválido. Tente novamente ou escolha outro vídeo.'
+        return f'Erro no download: {error_msg}'
+    if isinstance(e, OSError):
         # Erros do sistema operacional (arquivo inválido, permissões, etc)
         if e.errno == 22:  # Invalid argument
-            return jsonify({
-                'error': 'Erro ao salvar arquivo: nome do arquivo contém caracteres inválidos. Tente novamente.'
-            }), 400
-        return jsonify({'error': f'Erro do sistema: {str(e)}'}), 500
-    except Exception as e:
-        error_msg = str(e)
-        # Capturar outros erros relacionados a arquivos
-        if 'Invalid argument' in error_msg or 'Errno 22' in error_msg:
-            return jsonify({
-                'error': 'Erro ao salvar arquivo: nome inválido. Tente novamente.'
-            }), 400
-        return jsonify({'error': f'Erro interno: {error_msg}'}), 500
+            return 'Erro ao salvar arquivo: nome do arquivo contém caracteres inválidos. Tente novamente.'
+        return f'Erro do sistema: {error_msg}'
+    # Capturar outros erros relacionados a arquivos
+    if 'Invalid argument' in error_msg or 'Errno 22' in error_msg:
+        return 'Erro ao salvar arquivo: nome inválido. Tente novamente.'
+    return f'Erro interno: {error_msg}'
 
 
-@app.route('/api/progress/<video_id>')
-def get_progress(video_id):
+@app.route('/api/progress/<job_id>')
+def get_progress(job_id):
     """Retorna o progresso do download."""
-    progress = download_progress.get(video_id, {'status': 'unknown', 'percent': 0})
+    # Leitura sem lock: o snapshot armazenado nunca é modificado após publicado
+    progress = download_progress.get(job_id, {'status': 'unknown', 'percent': 0})
     return jsonify(progress)
 
 
+@app.route('/api/progress-stream/<job_id>')
+def stream_progress(job_id):
+    """
+    Envia o progresso do download via Server-Sent Events.
+    
+    A cada atualização publicada pelo worker o cliente recebe o snapshot mais
+    recente do job (atualizações intermediárias podem ser agrupadas); o stream
+    termina quando o job chega a 'completed' ou 'error'. Vários clientes podem
+    acompanhar o mesmo job. /api/progress continua disponível para polling.
+    """
+    def stream():
+        last = object()  # sentinela: nenhum snapshot enviado ainda
+        while True:
+            with progress_changed:
+                # Verificar e esperar sob o mesmo lock para não perder notificações.
+                # Atualizações de outros jobs também acordam a espera: wait_for volta
+                # a dormir pelo tempo restante até o snapshot deste job mudar ou o
+                # intervalo do heartbeat se esgotar.
+                progress_changed.wait_for(
+                    lambda: download_progress.get(job_id) is not last,
+                    timeout=SSE_HEARTBEAT
+                )
+                progress = download_progress.get(job_id)
+            
+            if progress is None:
+                # Job desconhecido ou expirado: avisar o cliente e fechar
+                yield f"data: {app.json.dumps({'status': 'unknown', 'percent': 0})}\n\n"
+                return
+            if progress is last:
+                # Comentário SSE para manter a conexão aberta
+                yield ": heartbeat\n\n"
+                continue
+            
+            last = progress
+            yield f"data: {app.json.dumps(progress)}\n\n"
+            if progress.get('status') in FINAL_STATUSES:
+                return
+    
+    return Response(
+        stream(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.route('/api/file/<filename>')
 def serve_file(filename):
-    """Serve o arquivo para download pelo navegador."""
+    """
+    Serve o arquivo para download pelo navegador.
+    
+    Usa respostas condicionais (ETag/Last-Modified e Range), permitindo que o
+    navegador retome downloads interrompidos sem recomeçar do zero.
+    """
     try:
-        filepath = os.path.join(DOWNLOAD_DIR, filename)
-        if os.path.exists(filepath):
+        # Aceitar apenas arquivos diretamente dentro de DOWNLOAD_DIR (sem path traversal)
+        filepath = (DOWNLOAD_DIR / filename).resolve()
+        if filepath.parent != DOWNLOAD_DIR:
+            return jsonify({'error': 'Nome de arquivo inválido'}), 400
+        if filepath.is_file():
             return send_file(
                 filepath,
                 as_attachment=True,
-                download_name=filename
+                download_name=filename,
+                conditional=True,
+                max_age=0
             )
         return jsonify({'error': 'Arquivo não encontrado'}), 404
     except Exception as e:
@@ -373,30 +608,31 @@ def cleanup_files():
     """Remove arquivos antigos do diretório de downloads."""
     try:
         count = 0
-        for f in os.listdir(DOWNLOAD_DIR):
-            filepath = os.path.join(DOWNLOAD_DIR, f)
-            if os.path.isfile(filepath):
-                os.remove(filepath)
-                count += 1
+        # scandir reaproveita o tipo de arquivo lido do diretório (sem stat extra por entrada)
+        with os.scandir(DOWNLOAD_DIR) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    os.unlink(entry.path)
+                    count += 1
         return jsonify({'message': f'{count} arquivos removidos'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB')
+
+
 def format_size(bytes_size: int) -> str:
     """Formata tamanho em bytes para string legível."""
     if bytes_size == 0:
         return "0 B"
     
-    units = ['B', 'KB', 'MB', 'GB']
-    unit_index = 0
-    size = float(bytes_size)
-    
-    while size >= 1024 and unit_index < len(units) - 1:
-        size /= 1024
-        unit_index += 1
+    # Índice da unidade direto pelo número de bits (cada unidade = 2^10),
+    # sem laço de divisões sucessivas
+    unit_index = min((max(int(bytes_size), 1).bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+    size = bytes_size / (1 << (unit_index * 10))
     
-    return f"{size:.1f} {units[unit_index]}"
+    return f"{size:.1f} {_SIZE_UNITS[unit_index]}"
 
 
 def format_duration(seconds: int) -> str:
@@ -404,9 +640,8 @@ def format_duration(seconds: int) -> str:
     if not seconds:
         return "00:00"
     
-    hours = seconds // 3600
-    minutes = (seconds % 3600) // 60
-    secs = seconds % 60
+    hours, rem = divmod(seconds, 3600)
+    minutes, secs = divmod(rem, 60)
     
     if hours > 0:
         return f"{hours:02d}:{minutes:02d}:{secs:02d}"
@@ -421,6 +656,10 @@ if __name__ == '__main__':
     print(" Acesse: http://localhost:5000")
     print("="*50 + "\n")
     
-    # threaded=True permite processar polling de progresso durante downloads
-    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
+    # Waitress: servidor WSGI de produção (funciona também no Windows), no lugar
+    # do servidor de desenvolvimento do Werkzeug. Cada stream SSE aberto ocupa
+    # uma thread, então o pool precisa ser maior que o número de downloads.
+    # Para desenvolvimento com reload automático: flask --app app run --debug
+    from waitress import serve
+    serve(app, host='0.0.0.0', port=5000, threads=SERVER_THREADS)
 
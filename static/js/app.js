@@ -237,8 +237,6 @@ async function handleDownload() {
     }
     
     state.isDownloading = true;
-    const videoId = state.currentVideo.id;
-    let progressInterval = null;
     
     // Mostrar progresso
     elements.videoCard.classList.add('hidden');
@@ -247,31 +245,8 @@ async function handleDownload() {
     
     updateProgress(0, 'Iniciando download...');
     
-    // Iniciar polling de progresso
-    progressInterval = setInterval(async () => {
-        try {
-            const progressResponse = await fetch(`/api/progress/${videoId}`);
-            const progressData = await progressResponse.json();
-            
-            if (progressData.status === 'downloading') {
-                const percent = progressData.percent || 0;
-                const speed = progressData.speed ? formatSpeed(progressData.speed) : '';
-                const eta = progressData.eta ? formatETA(progressData.eta) : '';
-                
-                let info = 'Baixando...';
-                if (speed) info += ` | ${speed}`;
-                if (eta) info += ` | ETA: ${eta}`;
-                
-                updateProgress(percent, info);
-            } else if (progressData.status === 'finished') {
-                updateProgress(100, 'Processando arquivo...');
-            }
-        } catch (e) {
-            // Ignorar erros de polling
-        }
-    }, 500);
-    
     try {
+        // Enfileirar download no servidor (resposta imediata com job_id)
         const response = await fetch('/api/download', {
             method: 'POST',
             headers: {
@@ -285,30 +260,23 @@ async function handleDownload() {
             })
         });
         
-        // Parar polling
-        if (progressInterval) {
-            clearInterval(progressInterval);
-            progressInterval = null;
-        }
-        
         const data = await response.json();
         
         if (!response.ok) {
             throw new Error(data.error || 'Erro no download');
         }
         
+        // Acompanhar progresso até o job terminar
+        const result = await waitForJob(data.job_id);
+        
         updateProgress(100, 'Download concluído!');
         
         // Mostrar tela de conclusão
         setTimeout(() => {
-            showComplete(data.filename);
+            showComplete(result.filename);
         }, 500);
         
     } catch (error) {
-        // Parar polling em caso de erro
-        if (progressInterval) {
-            clearInterval(progressInterval);
-        }
         console.error('Erro no download:', error);
         showError(error.message);
     } finally {
@@ -316,6 +284,85 @@ async function handleDownload() {
     }
 }
 
+/**
+ * Acompanha o progresso do job até ele ser concluído ou falhar.
+ * Usa Server-Sent Events quando disponível e polling como alternativa.
+ */
+function waitForJob(jobId) {
+    if (!window.EventSource) {
+        return pollJob(jobId);
+    }
+    
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`/api/progress-stream/${jobId}`);
+        
+        source.onmessage = (event) => {
+            const progressData = JSON.parse(event.data);
+            
+            if (handleProgressData(progressData, resolve, reject)) {
+                source.close();
+            }
+        };
+        
+        source.onerror = () => {
+            // Conexão SSE falhou: continuar acompanhando por polling
+            source.close();
+            pollJob(jobId).then(resolve, reject);
+        };
+    });
+}
+
+/**
+ * Consulta o progresso do job periodicamente (fallback sem SSE)
+ */
+function pollJob(jobId) {
+    return new Promise((resolve, reject) => {
+        const progressInterval = setInterval(async () => {
+            try {
+                const progressResponse = await fetch(`/api/progress/${jobId}`);
+                const progressData = await progressResponse.json();
+                
+                if (handleProgressData(progressData, resolve, reject)) {
+                    clearInterval(progressInterval);
+                }
+            } catch (e) {
+                // Ignorar erros de polling
+            }
+        }, 500);
+    });
+}
+
+/**
+ * Atualiza a interface com o progresso recebido.
+ * Retorna true quando o job terminou (concluído ou com erro).
+ */
+function handleProgressData(progressData, resolve, reject) {
+    if (progressData.status === 'downloading') {
+        const percent = progressData.percent || 0;
+        const speed = progressData.speed ? formatSpeed(progressData.speed) : '';
+        const eta = progressData.eta ? formatETA(progressData.eta) : '';
+        
+        let info = 'Baixando...';
+        if (speed) info += ` | ${speed}`;
+        if (eta) info += ` | ETA: ${eta}`;
+        
+        updateProgress(percent, info);
+    } else if (progressData.status === 'finished') {
+        updateProgress(100, 'Processando arquivo...');
+    } else if (progressData.status === 'completed') {
+        resolve(progressData);
+        return true;
+    } else if (progressData.status === 'error') {
+        reject(new Error(progressData.error || 'Erro no download'));
+        return true;
+    } else if (progressData.status === 'unknown') {
+        // Job desconhecido pelo servidor (reiniciado ou progresso expirado)
+        reject(new Error('Download não encontrado no servidor. Tente novamente.'));
+        return true;
+    }
+    return false;
+}
+
 /**
  * Formata velocidade de download
  */